@@ -0,0 +1,111 @@
+import argparse
+import random
+import time
+
+import engine
+
+
+def generate_level(size, seed=0, monsters=None):
+    # Квадратная карта: стены по краю, случайные стены, вода, песок, ключи, двери и фишки внутри
+    rng = random.Random(seed)
+    rows = [['#'] * size for _ in range(size)]
+    for y in range(1, size - 1):
+        for x in range(1, size - 1):
+            roll = rng.random()
+            if roll < 0.12:
+                rows[y][x] = '#'
+            elif roll < 0.14:
+                rows[y][x] = 'W'
+            elif roll < 0.17:
+                rows[y][x] = 'S'
+            elif roll < 0.18:
+                rows[y][x] = rng.choice('Kk')
+            elif roll < 0.19:
+                rows[y][x] = rng.choice('Dd')
+            elif roll < 0.20:
+                rows[y][x] = '*'
+            else:
+                rows[y][x] = '.'
+    rows[size // 2][size // 2] = 'P'
+    rows[size - 2][size - 2] = 'O'
+    if monsters is None:
+        monsters = max(1, size // 4)
+    # Каждый монстр ходит по своему квадрату, начиная со своей клетки
+    trajectories = {}
+    side = 3 * engine.TILE_SIZE
+    while len(trajectories) < min(monsters, (size - 2) ** 2 - 2):
+        x, y = rng.randrange(1, size - 1), rng.randrange(1, size - 1)
+        if rows[y][x] in 'PO' or (x, y) in trajectories:
+            continue
+        rows[y][x] = 'M'
+        left, top = x * engine.TILE_SIZE, y * engine.TILE_SIZE
+        trajectories[(x, y)] = [[left, top], [left + side, top], [left + side, top + side], [left, top + side]]
+    return [''.join(row) for row in rows], trajectories
+
+
+def bench_steps(level_data, trajectories, steps, seed=0):
+    rng = random.Random(seed)
+    moves = [rng.choice(list(engine.DIRECTIONS.values())) for _ in range(steps)]
+    state = engine.GameState(level_data, trajectories)
+    elapsed = 0.0
+    done = 0
+    while done < steps:
+        start = time.perf_counter()
+        while done < steps and not state.game_over and not state.level_complete:
+            state.move(*moves[done])
+            done += 1
+        elapsed += time.perf_counter() - start
+        if done < steps:
+            state = engine.GameState(level_data, trajectories)
+    return steps / elapsed
+
+
+def bench_ticks(level_data, trajectories, ticks):
+    state = engine.GameState(level_data, trajectories)
+    elapsed = 0.0
+    done = 0
+    while done < ticks:
+        start = time.perf_counter()
+        while done < ticks and not state.game_over:
+            state.tick()
+            done += 1
+        elapsed += time.perf_counter() - start
+        if done < ticks:
+            state = engine.GameState(level_data, trajectories)
+    return ticks / elapsed
+
+
+def bench_sessions(level_data, trajectories, sessions, length, seed=0):
+    rng = random.Random(seed)
+    inputs = [''.join(rng.choice('wasd....') for _ in range(length)) for _ in range(sessions)]
+    start = time.perf_counter()
+    for keys in inputs:
+        engine.GameState(level_data, trajectories).run(keys)
+    return sessions / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hurry Up headless engine benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[16, 32, 64, 128, 256])
+    parser.add_argument('--steps', type=int, default=20000)
+    parser.add_argument('--ticks', type=int, default=20000)
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--length', type=int, default=600)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--monsters', type=int, default=None, help='monsters per level, default size // 4')
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'monsters':>9} {'steps/s':>12} {'ticks/s':>12} {'sessions/s':>12}")
+    for size in args.sizes:
+        level_data, trajectories = generate_level(size, args.seed, args.monsters)
+        # Как и в игре, перезапуск уровня берёт уже скомпилированную карту
+        level_data = engine.compile_level(level_data)
+        monsters = len(engine.GameState(level_data, trajectories).monsters)
+        steps = bench_steps(level_data, trajectories, args.steps, args.seed)
+        ticks = bench_ticks(level_data, trajectories, args.ticks)
+        sessions = bench_sessions(level_data, trajectories, args.sessions, args.length, args.seed)
+        print(f"{size:>6} {monsters:>9} {steps:>12.0f} {ticks:>12.0f} {sessions:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
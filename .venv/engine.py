@@ -0,0 +1,333 @@
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+
+TILE_SIZE = 60
+TIME_LIMIT = 100
+TICKS_PER_SECOND = 60
+INVENTORY_SIZE = 7
+MONSTER_SPEED = 4
+
+# Ключ открывает дверь с тем же индикатором
+INDICATORS = {'K': 1, 'k': 2, 'D': 1, 'd': 2}
+DIRECTIONS = {'w': (0, -1), 'a': (-1, 0), 's': (0, 1), 'd': (1, 0)}
+# Куда можно толкнуть песок. В клетке хранится один тайл, поэтому песок не может лечь поверх
+# ключа, двери, фишки, другого песка, портала или пустоты - только на пол или в воду
+SAND_TARGETS = '.W'
+
+COMPILED_SUFFIX = '.lvlc'
+COMPILED_MAGIC = b'HULC'
+COMPILED_VERSION = 2
+# magic, версия, ширина, высота, размер и crc32 исходника, число фишек, число точек появления
+COMPILED_HEADER = struct.Struct('<4sHIIqIII')
+COMPILED_SPAWN = struct.Struct('<BII')
+# '[' и '>' - пустота, под игроком и монстром пол
+TILE_CODES = bytes.maketrans(b'[>PM', b'  ..')
+
+
+def load_level(path):
+    level_data = []
+    try:
+        with open(path, 'r') as file:
+            for line in file:
+                level_data.append(line.strip())
+    except FileNotFoundError:
+        print(f"File {path} not found")
+        return []
+    return level_data
+
+
+def load_trajectories(path):
+    # Строка "[x,y]" начинает путь монстра из клетки (x, y),
+    # точки до первого заголовка - общий путь для монстров без своего
+    trajectories = {}
+    key = None
+    with open(path, 'r') as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('['):
+                x, y = map(int, line.strip('[]').split(','))
+                key = (x, y)
+                trajectories[key] = []
+                continue
+            x, y = map(float, line.split(','))
+            trajectories.setdefault(key, []).append([x, y])
+    return trajectories
+
+
+class CompiledLevel:
+    def __init__(self, width, height, tiles, spawns, chips, buffer=None):
+        self.width = width
+        self.height = height
+        # tiles - коды клеток построчно, spawns - (код, x, y) игрока и монстров
+        self.tiles = tiles
+        self.spawns = spawns
+        self.chips = chips
+        self.buffer = buffer
+
+
+def compile_level(level_data):
+    width = max(map(len, level_data), default=0)
+    tiles = bytearray(b' ') * (width * len(level_data))
+    spawns = []
+    chips = 0
+    for y, row in enumerate(level_data):
+        for code in 'PM':
+            x = row.find(code)
+            while x >= 0:
+                spawns.append((ord(code), x, y))
+                x = row.find(code, x + 1)
+        chips += row.count('*')
+        # Один байт на клетку: не-ASCII символ сдвинул бы строку, поэтому он сразу даёт UnicodeEncodeError
+        tiles[y * width:y * width + len(row)] = row.encode('ascii').translate(TILE_CODES)
+    # Монстры идут в порядке чтения карты, как их раньше нумеровал разбор текста
+    spawns.sort(key=lambda spawn: (spawn[2], spawn[1]))
+    return CompiledLevel(width, len(level_data), tiles, spawns, chips)
+
+
+def source_signature(data):
+    # Размер и crc32 текста: копия с сохранённым mtime или правка той же длины тоже пересобирают карту
+    return len(data), zlib.crc32(data)
+
+
+def write_compiled(path, level, signature):
+    # Пишется во временный файл и подменяется целиком, параллельный запуск не увидит половину файла
+    directory, name = os.path.split(path)
+    handle, temp_path = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=directory or '.')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            file.write(COMPILED_HEADER.pack(COMPILED_MAGIC, COMPILED_VERSION, level.width, level.height,
+                                            *signature, level.chips, len(level.spawns)))
+            file.write(level.tiles)
+            for spawn in level.spawns:
+                file.write(COMPILED_SPAWN.pack(*spawn))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def load_compiled(path, signature):
+    try:
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(buffer) < COMPILED_HEADER.size:
+        buffer.close()
+        return None
+    magic, version, width, height, size, checksum, chips, spawn_count = COMPILED_HEADER.unpack_from(buffer)
+    expected = COMPILED_HEADER.size + width * height + spawn_count * COMPILED_SPAWN.size
+    if (magic != COMPILED_MAGIC or version != COMPILED_VERSION or len(buffer) != expected or
+            (size, checksum) != signature):
+        buffer.close()
+        return None
+    view = memoryview(buffer)
+    tiles_end = COMPILED_HEADER.size + width * height
+    tiles = view[COMPILED_HEADER.size:tiles_end]
+    spawns = list(COMPILED_SPAWN.iter_unpack(view[tiles_end:]))
+    return CompiledLevel(width, height, tiles, spawns, chips, buffer)
+
+
+def open_level(path):
+    # Скомпилированная копия лежит рядом с текстом и пересобирается, только если текст изменился
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except FileNotFoundError:
+        print(f"File {path} not found")
+        return compile_level([])
+    signature = source_signature(data)
+    level = load_compiled(path + COMPILED_SUFFIX, signature)
+    if level is None:
+        level = compile_level([line.strip() for line in data.decode().splitlines()])
+        try:
+            write_compiled(path + COMPILED_SUFFIX, level, signature)
+        except OSError:
+            pass
+    return level
+
+
+class LevelGrid:
+    def __init__(self, width, height, tiles=None):
+        self.width = width
+        self.height = height
+        # Код тайла на клетку, ' ' - пустота за пределами уровня
+        if tiles is None:
+            self.tiles = bytearray(b' ') * (width * height)
+        else:
+            self.tiles = bytearray(tiles)
+
+    def get(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return chr(self.tiles[y * self.width + x])
+        return ' '
+
+    def set(self, x, y, code):
+        self.tiles[y * self.width + x] = ord(code)
+
+
+class MonsterSwarm:
+    def __init__(self, trajectories, speed=MONSTER_SPEED):
+        # Все пути склеены в один массив точек, у каждого монстра своё начало и длина
+        self.path_start = np.zeros(len(trajectories), dtype=np.int64)
+        self.path_length = np.array([len(path) for path in trajectories], dtype=np.int64)
+        if len(trajectories):
+            self.path_start[1:] = np.cumsum(self.path_length)[:-1]
+            self.points = np.array([point for path in trajectories for point in path], dtype=np.float64)
+        else:
+            self.points = np.zeros((0, 2), dtype=np.float64)
+        self.current_point_index = np.zeros(len(trajectories), dtype=np.int64)
+        self.next_point_index = 1 % np.maximum(self.path_length, 1)
+        self.speed = np.full(len(trajectories), speed, dtype=np.float64)
+        self.position = self.points[self.path_start].copy()
+        self.rects = np.floor(self.position + 0.5).astype(np.int64)
+        # Прямоугольники на прошлом тике - отрисовка рисует монстров между двумя тиками
+        self.previous_rects = self.rects
+
+    def __len__(self):
+        return len(self.position)
+
+    def update(self):
+        if not len(self):
+            return
+        current = self.points[self.path_start + self.current_point_index]
+        target = self.points[self.path_start + self.next_point_index]
+
+        delta = target - current
+        distance = np.sqrt(delta[:, 0] ** 2 + delta[:, 1] ** 2)[:, None]
+        moving = distance > 0
+        velocity = np.where(moving, self.speed[:, None] * delta / np.where(moving, distance, 1), 0)
+
+        self.position += velocity
+        self.previous_rects = self.rects
+        # Прямоугольник спрайта берёт позицию до привязки к точке, как и раньше в Monster.update
+        self.rects = np.floor(self.position + 0.5).astype(np.int64)
+
+        # Проверка достижения точки
+        overshoot = ((velocity > 0) & (self.position >= target)) | ((velocity < 0) & (self.position <= target))
+        self.position = np.where(overshoot, target, self.position)
+
+        arrived = np.all(self.position == target, axis=1)
+        self.current_point_index = np.where(arrived, self.next_point_index, self.current_point_index)
+        self.next_point_index = np.where(arrived, (self.next_point_index + 1) % self.path_length,
+                                         self.next_point_index)
+
+    def collides(self, left, top):
+        if not len(self):
+            return False
+        return bool(np.any((np.abs(self.rects[:, 0] - left) < TILE_SIZE) &
+                           (np.abs(self.rects[:, 1] - top) < TILE_SIZE)))
+
+    def visible(self, left, top, right, bottom, alpha=1.0):
+        # alpha - доля пройденного времени до следующего тика, 1.0 - позиция последнего тика
+        rects = self.rects
+        if alpha < 1.0:
+            rects = np.floor(self.previous_rects + (rects - self.previous_rects) * alpha + 0.5).astype(np.int64)
+        mask = ((rects[:, 0] > left - TILE_SIZE) & (rects[:, 0] < right) &
+                (rects[:, 1] > top - TILE_SIZE) & (rects[:, 1] < bottom))
+        return rects[mask].tolist()
+
+
+class GameState:
+    def __init__(self, level, trajectories):
+        if not isinstance(level, CompiledLevel):
+            level = compile_level(level)
+        if isinstance(trajectories, list):
+            trajectories = {None: trajectories}
+        self.grid = LevelGrid(level.width, level.height, level.tiles)
+        self.player = None
+        self.inventory = []
+        self.chips_left = level.chips
+        self.time_left = TIME_LIMIT
+        self.ticks = 0
+        self.game_over = False
+        self.level_complete = False
+        paths = []
+        for code, x, y in level.spawns:
+            if code == ord('P'):
+                self.player = (x, y)
+            else:
+                # Без своего и общего пути монстр стоит на месте
+                paths.append(trajectories.get((x, y)) or trajectories.get(None)
+                             or [[x * TILE_SIZE, y * TILE_SIZE]])
+        self.monsters = MonsterSwarm(paths)
+
+    def move(self, dx, dy):
+        # Возвращает список изменений на карте, чтобы отрисовка могла обновить спрайты
+        changes = []
+        if self.game_over or self.level_complete:
+            return changes
+        x, y = self.player
+        x += dx
+        y += dy
+        tile_type = self.grid.get(x, y)
+        if tile_type == '#':
+            return changes
+
+        if tile_type in 'Dd':
+            if INDICATORS[tile_type] not in self.inventory:
+                # Блокируем проход, если дверь не открыта
+                return changes
+            self.grid.set(x, y, '.')
+            changes.append(('door', x, y))
+        elif tile_type == 'S':
+            sand_x, sand_y = x + dx, y + dy
+            target = self.grid.get(sand_x, sand_y)
+            if target not in SAND_TARGETS:
+                return changes
+            self.grid.set(x, y, '.')
+            if target == 'W':
+                self.grid.set(sand_x, sand_y, '.')
+                changes.append(('fill', x, y, sand_x, sand_y))
+            else:
+                self.grid.set(sand_x, sand_y, 'S')
+                changes.append(('push', x, y, sand_x, sand_y))
+        elif tile_type in 'Kk':
+            if len(self.inventory) < INVENTORY_SIZE:
+                self.inventory.append(INDICATORS[tile_type])
+            self.grid.set(x, y, '.')
+            changes.append(('key', x, y))
+        elif tile_type == '*':
+            self.grid.set(x, y, '.')
+            self.chips_left -= 1
+            changes.append(('chip', x, y))
+
+        self.player = (x, y)
+        changes.append(('player', x, y))
+        if tile_type == 'W':
+            self.game_over = True
+        elif tile_type == 'O' and self.chips_left == 0:
+            self.level_complete = True
+        return changes
+
+    def monster_hit(self):
+        return self.monsters.collides(self.player[0] * TILE_SIZE, self.player[1] * TILE_SIZE)
+
+    def tick(self):
+        if self.game_over or self.level_complete:
+            return
+        self.ticks += 1
+        if self.chips_left > 0 and self.ticks % TICKS_PER_SECOND == 0:
+            self.time_left -= 1
+            if self.time_left < 0:
+                self.time_left = TIME_LIMIT
+        self.monsters.update()
+        if self.monster_hit():
+            self.game_over = True
+
+    def run(self, inputs):
+        # inputs - по одному символу на тик: 'w', 'a', 's', 'd' или любой другой для паузы
+        for key in inputs:
+            if key in DIRECTIONS:
+                self.move(*DIRECTIONS[key])
+            self.tick()
+            if self.game_over or self.level_complete:
+                break
+        return self
@@ -0,0 +1,840 @@
+import sys
+import pygame
+import os
+import time
+import engine
+from profiler import Profiler
+
+pygame.init()
+
+SCREEN_WIDTH = 1000
+SCREEN_HEIGHT = 850
+BOARD_WIDTH = 9
+BOARD_HEIGHT = 9
+TILE_SIZE = engine.TILE_SIZE
+BROWN = (123, 63, 0)
+RED = (255, 0, 0)
+GREEN = (0, 255, 0)
+BLACK = (0, 0, 0)
+GRAY = (200, 200, 200)
+GOLD = (255, 215, 0)
+YELLOW = (255, 255, 0)
+BLUE = (0, 0, 255)
+LIGHT_YELLOW = (255, 255, 150)
+WHITE = (255, 255, 255)
+GRID_LINE_COLOR = BLACK
+STATIC_CHUNK = 16
+CHUNK_COLORKEY = (255, 0, 255)
+LIVE_MARGIN = 2
+DIRTY_RECT_UPDATES = False
+# Движок тикает TICKS_PER_SECOND раз в секунду независимо от частоты кадров
+FRAME_RATE = 60
+TICK_TIME = 1 / engine.TICKS_PER_SECOND
+MAX_FRAME_TIME = 0.25
+PROFILE_FILE = 'profile.csv'
+STATIC_TILES = b' #.WO'
+LEVEL_FILE = 'level.txt'
+RECORD_FILE = 'record.txt'
+TRAJECTORY_FILE = 'trajectory.txt'
+
+pictures = {
+    '#': 'стены.png',
+    '.': 'простая плитка.png',
+    'K': GOLD,
+    'k': BLUE,
+    'D': GOLD,
+    'd': BLUE,
+    'W': BLUE,
+    'S': YELLOW,
+    '*': LIGHT_YELLOW,
+    'P': GREEN,
+    'O': BLUE,
+    'M': BLACK
+}
+
+
+def load_image(name, colorkey=None):
+    fullname = os.path.join('data', name)
+    if not os.path.isfile(fullname):
+        print(f"Файл с изображением '{fullname}' не найден")
+        sys.exit()
+    image = pygame.image.load(fullname)
+    if colorkey is not None:
+        image = image.convert()
+        if colorkey == -1:
+            colorkey = image.get_at((0, 0))
+        image.set_colorkey(colorkey)
+    return image
+
+
+class SurfaceCache:
+    def __init__(self):
+        # Ключ - имя файла или цвет заливки, поверхность общая для всех спрайтов
+        self.surfaces = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, color):
+        surface = self.surfaces.get(color)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        self.misses += 1
+        if type(color) is tuple:
+            surface = pygame.Surface([TILE_SIZE, TILE_SIZE])
+            surface.fill(color)
+        else:
+            surface = load_image(color)
+        if pygame.display.get_surface() is not None:
+            if surface.get_flags() & pygame.SRCALPHA:
+                surface = surface.convert_alpha()
+            else:
+                surface = surface.convert()
+        self.surfaces[color] = surface
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+tile_cache = SurfaceCache()
+
+
+class Base(pygame.sprite.Sprite):
+    def __init__(self, x, y, color, indicator=0):
+        super().__init__()
+        self.indicator = indicator
+        self.image = tile_cache.get(color)
+        self.rect = self.image.get_rect()
+        self.rect.x = x * TILE_SIZE
+        self.rect.y = y * TILE_SIZE
+
+
+class Player(Base):
+    def __init__(self, x, y):
+        super().__init__(x, y, GREEN)
+
+
+class Door(Base):
+    def __init__(self, x, y, color, indicator=0):
+        super().__init__(x, y, color, indicator)
+        self.is_open = False
+
+
+class Board:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.board = [[0] * width for _ in range(height)]
+        self.left = (SCREEN_WIDTH - width * TILE_SIZE) // 2
+        self.top = 0
+        self.cell_size = TILE_SIZE
+        self.screen_2 = pygame.Surface((self.width * self.cell_size,
+                                        self.height * self.cell_size))
+        self.camera_x = 0
+        self.camera_y = 0
+        self.backdrop = None
+        self.static_chunks = {}
+        self.static_images = {}
+        self.monster_image = None
+
+    def set_view(self, left, top, cell_size):
+        self.left = left
+        self.top = top
+        self.cell_size = cell_size
+        self.screen_2 = pygame.Surface((self.width * self.cell_size, self.height * self.cell_size))
+        self.backdrop = None
+
+    def screen_rect(self):
+        return pygame.Rect(self.left, self.top, self.width * self.cell_size, self.height * self.cell_size)
+
+    def render(self, screen):
+        for y in range(self.height):
+            for x in range(self.width):
+                pygame.draw.rect(screen, GRAY, (
+                    x * self.cell_size,
+                    y * self.cell_size, self.cell_size,
+                    self.cell_size), width=1)
+                pygame.draw.rect(screen, BLACK, (
+                    x * self.cell_size + 1,
+                    y * self.cell_size + 1, self.cell_size - 2,
+                    self.cell_size - 2))
+
+    def get_click(self, mouse_pos):
+        cell = self.get_cell(mouse_pos)
+        self.on_click(cell)
+
+    def get_cell(self, mouse_pos):
+        if self.left <= mouse_pos[0] < self.left + self.width * self.cell_size and \
+                self.top <= mouse_pos[1] < self.top + self.height * self.cell_size:
+            return (int((mouse_pos[1] - self.top) / self.cell_size),
+                    int((mouse_pos[0] - self.left) / self.cell_size))
+        else:
+            return None
+
+    def on_click(self, cell_coords):
+        pass
+
+    def unload_level(self):
+        self.level = None
+        self.trajectories = None
+        self.state = None
+        self.player = self.keys = self.doors = self.chips = self.sand = None
+        self.p1 = None
+        self.cells = None
+        self.live_chunks = set()
+        self.static_chunks = {}
+        self.changed_chunks = set()
+        tile_cache.clear()
+
+    def load_level(self, filename, trajectory):
+        self.unload_level()
+        # Поверхности, которые рисуются каждый кадр или при запекании, берутся из кэша один раз на уровень
+        self.static_images = {code: tile_cache.get(pictures[code]) for code in '#O.W'}
+        self.monster_image = tile_cache.get(pictures['M'])
+        self.level = engine.open_level(os.path.join('data', filename))
+        self.trajectories = engine.load_trajectories(os.path.join('data', trajectory))
+        self.restart_level()
+
+    def restart_level(self):
+        # Уровень уже разобран: копируется массив клеток и заново создаются только спрайты рядом с игроком
+        self.state = engine.GameState(self.level, self.trajectories)
+        for chunk in self.changed_chunks:
+            self.static_chunks.pop(chunk, None)
+        self.changed_chunks = set()
+        self.keys = pygame.sprite.Group()
+        self.doors = pygame.sprite.Group()
+        self.chips = pygame.sprite.Group()
+        self.sand = pygame.sprite.Group()
+        self.groups = {'K': self.keys, 'k': self.keys, 'D': self.doors, 'd': self.doors,
+                       '*': self.chips, 'S': self.sand}
+        self.cells = {}
+        self.live_chunks = set()
+        self.p1 = Player(*self.state.player)
+        self.player = pygame.sprite.Group(self.p1)
+        self.update_camera()
+
+    def update_camera(self):
+        # Мировые координаты не меняются, игрок всегда в центре поля
+        self.camera_x = self.width // 2 * self.cell_size - self.p1.rect.x
+        self.camera_y = self.height // 2 * self.cell_size - self.p1.rect.y
+        self.update_live_chunks()
+
+    def update_live_chunks(self):
+        x, y = self.state.player
+        reach_x = self.width // 2 + LIVE_MARGIN
+        reach_y = self.height // 2 + LIVE_MARGIN
+        needed = {(chunk_x, chunk_y)
+                  for chunk_y in range(max(y - reach_y, 0) // STATIC_CHUNK, (y + reach_y) // STATIC_CHUNK + 1)
+                  for chunk_x in range(max(x - reach_x, 0) // STATIC_CHUNK, (x + reach_x) // STATIC_CHUNK + 1)}
+        for chunk in self.live_chunks - needed:
+            self.unload_chunk(*chunk)
+        # Запечённые куски вдали от игрока выбрасываются, кэш не растёт вместе с картой
+        for chunk in self.static_chunks.keys() - needed:
+            del self.static_chunks[chunk]
+        for chunk in needed - self.live_chunks:
+            self.load_chunk(*chunk)
+        self.live_chunks = needed
+
+    def chunk_rows(self, chunk_x, chunk_y):
+        grid = self.state.grid
+        left = chunk_x * STATIC_CHUNK
+        right = min(left + STATIC_CHUNK, grid.width)
+        for y in range(chunk_y * STATIC_CHUNK, min((chunk_y + 1) * STATIC_CHUNK, grid.height)):
+            if left < right:
+                yield y, left, grid.tiles[y * grid.width + left:y * grid.width + right]
+
+    def load_chunk(self, chunk_x, chunk_y):
+        for y, left, row in self.chunk_rows(chunk_x, chunk_y):
+            # Строка без ключей, дверей, фишек и песка пропускается целиком
+            if not row.translate(None, STATIC_TILES):
+                continue
+            for i, code in enumerate(row):
+                tile_type = chr(code)
+                if tile_type in self.groups:
+                    tile = Base(left + i, y, pictures[tile_type], engine.INDICATORS.get(tile_type, 0))
+                    self.cells[(left + i, y)] = tile
+                    self.groups[tile_type].add(tile)
+
+    def unload_chunk(self, chunk_x, chunk_y):
+        for y, left, row in self.chunk_rows(chunk_x, chunk_y):
+            for x in range(left, left + len(row)):
+                tile = self.cells.pop((x, y), None)
+                if tile:
+                    tile.kill()
+
+    def move_level(self, dx, dy, inventory):
+        # dx, dy - сдвиг уровня на экране, игрок в мире идёт в обратную сторону
+        for change in self.state.move(-dx, -dy):
+            kind, x, y = change[:3]
+            if kind == 'player':
+                self.p1.rect.x = x * TILE_SIZE
+                self.p1.rect.y = y * TILE_SIZE
+                self.update_camera()
+            elif kind == 'key':
+                key = self.cells.pop((x, y))
+                inventory.add_to_inventory(key)
+                key.kill()
+            elif kind == 'door':
+                door = self.cells.pop((x, y))
+                door.is_open = True
+                door.kill()
+            elif kind == 'chip':
+                self.cells.pop((x, y)).kill()
+            elif kind == 'push':
+                sand = self.cells.pop((x, y))
+                sand.rect.x = change[3] * TILE_SIZE
+                sand.rect.y = change[4] * TILE_SIZE
+                self.cells[change[3:]] = sand
+            elif kind == 'fill':
+                self.cells.pop((x, y)).kill()
+                self.invalidate_cell(*change[3:])
+
+    def move_monsters(self):
+        self.state.tick()
+
+    def invalidate_cell(self, x, y):
+        chunk = (x // STATIC_CHUNK, y // STATIC_CHUNK)
+        self.static_chunks.pop(chunk, None)
+        self.changed_chunks.add(chunk)
+
+    def bake_chunk(self, chunk_x, chunk_y):
+        # Стены, пол, вода и портал рисуются один раз на кусок карты. Тайлы непрозрачные, поэтому
+        # кусок без пустоты хранится без альфа-канала, а пустота отмечается цветовым ключом
+        size = STATIC_CHUNK * TILE_SIZE
+        surface = pygame.Surface((size, size))
+        has_void = (chunk_x + 1) * STATIC_CHUNK > self.state.grid.width or \
+            (chunk_y + 1) * STATIC_CHUNK > self.state.grid.height
+        for y, left, row in self.chunk_rows(chunk_x, chunk_y):
+            has_void = has_void or b' ' in row
+        if has_void:
+            surface.fill(CHUNK_COLORKEY)
+            surface.set_colorkey(CHUNK_COLORKEY)
+        for y, left, row in self.chunk_rows(chunk_x, chunk_y):
+            for i, code in enumerate(row):
+                tile_type = chr(code)
+                if tile_type == ' ':
+                    continue
+                pos = ((left + i - chunk_x * STATIC_CHUNK) * TILE_SIZE, (y - chunk_y * STATIC_CHUNK) * TILE_SIZE)
+                if tile_type in '#O':
+                    surface.blit(self.static_images[tile_type], pos)
+                    continue
+                surface.blit(self.static_images['.'], pos)
+                if tile_type == 'W':
+                    surface.blit(self.static_images['W'], pos)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        return surface
+
+    def draw_static(self, view):
+        size = STATIC_CHUNK * TILE_SIZE
+        for chunk_y in range(max(view.top, 0) // size, (view.bottom - 1) // size + 1):
+            for chunk_x in range(max(view.left, 0) // size, (view.right - 1) // size + 1):
+                if chunk_x * STATIC_CHUNK >= self.state.grid.width or chunk_y * STATIC_CHUNK >= self.state.grid.height:
+                    continue
+                chunk = self.static_chunks.get((chunk_x, chunk_y))
+                if chunk is None:
+                    chunk = self.bake_chunk(chunk_x, chunk_y)
+                    self.static_chunks[(chunk_x, chunk_y)] = chunk
+                self.screen_2.blit(chunk, (chunk_x * size + self.camera_x, chunk_y * size + self.camera_y))
+
+    def draw_group(self, group, view):
+        for sprite in group:
+            if view.colliderect(sprite.rect):
+                self.screen_2.blit(sprite.image, sprite.rect.move(self.camera_x, self.camera_y))
+
+    def draw_monsters(self, view, alpha):
+        # Позиции монстров хранит движок, рисуются только попавшие в окно
+        for x, y in self.state.monsters.visible(view.left, view.top, view.right, view.bottom, alpha):
+            self.screen_2.blit(self.monster_image, (x + self.camera_x, y + self.camera_y))
+
+    def draw_level(self, screen, alpha=1.0):
+        if self.backdrop is None:
+            self.backdrop = pygame.Surface(self.screen_2.get_size())
+            self.render(self.backdrop)
+        view = self.screen_2.get_rect(topleft=(-self.camera_x, -self.camera_y))
+        self.screen_2.blit(self.backdrop, (0, 0))
+        self.draw_static(view)
+        self.draw_group(self.player, view)
+        self.draw_group(self.keys, view)
+        self.draw_group(self.doors, view)
+        self.draw_group(self.chips, view)
+        self.draw_group(self.sand, view)
+        self.draw_monsters(view, alpha)
+        screen.blit(self.screen_2, (self.left, self.top))
+        return self.screen_rect()
+
+    def check_portal_collision(self, screen, inventory):
+        if self.state.level_complete:
+            total_score = 1000 + self.state.time_left * 10
+            record = load_record()
+            improvement = total_score - record if record != 0 else "——"
+            save_record(max(total_score, record))
+            inventory.items = []
+            PopupWindow(screen, f"Total Score: {total_score}      Record: {record}     Improvement: {improvement}", 600,
+                        200).run()
+            return True
+        return False
+
+
+def load_record():
+    try:
+        with open(RECORD_FILE, 'r') as f:
+            return int(f.read())
+    except FileNotFoundError:
+        return 0
+
+
+def save_record(record):
+    with open(RECORD_FILE, 'w') as f:
+        f.write(str(record))
+
+
+class Inventory(Board):
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self.items = []
+
+    def render(self, screen):
+        for y in range(self.height):
+            for x in range(self.width):
+                pygame.draw.rect(screen, 'white', (
+                    x * self.cell_size + self.left, y * self.cell_size + self.top,
+                    self.cell_size, self.cell_size), width=1)
+                pygame.draw.rect(screen, GRAY, (
+                    x * self.cell_size + self.left + 1, y * self.cell_size + self.top + 1,
+                    self.cell_size - 2, self.cell_size - 2))
+        for i, item in enumerate(self.items):
+            item.rect.x = self.left + i * self.cell_size
+            item.rect.y = self.top
+            screen.blit(item.image, item.rect)
+
+    def add_to_inventory(self, item):
+        if len(self.items) < self.width:
+            self.items.append(item)
+
+
+class Button:
+    def __init__(self, text, x, y, width, height, color, hover_color, action=None, image=None):
+        self.text = text
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.color = color
+        self.hover_color = hover_color
+        self.action = action
+        self.font = pygame.font.Font(None, 36)
+        self.text_surface = self.font.render(text, True, BLACK)
+        self.text_rect = self.text_surface.get_rect(center=(x + width // 2, y + height // 2))
+        self.rect = pygame.Rect(x, y, width, height)
+        self.image = image
+
+    def draw(self, screen):
+        mouse_pos = pygame.mouse.get_pos()
+        if self.image:
+            if self.rect.collidepoint(mouse_pos):
+                screen.blit(self.image, self.rect)
+                pygame.draw.rect(screen, self.hover_color, self.rect, 2)  # add outline to image
+            else:
+                screen.blit(self.image, self.rect)
+        else:
+            if self.rect.collidepoint(mouse_pos):
+                pygame.draw.rect(screen, self.hover_color, self.rect)
+            else:
+                pygame.draw.rect(screen, self.color, self.rect)
+        screen.blit(self.text_surface, self.text_rect)
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.rect.collidepoint(event.pos) and self.action:
+                self.action()
+
+
+class PopupWindow:
+    def __init__(self, screen, text, width, height, background_image=None, close_image=None):
+        self.screen = screen
+        self.width = width
+        self.height = height
+        self.text = text
+        self.font = pygame.font.Font(None, 24)
+        self.text_surface = self.font.render(text, True, BLACK)
+        self.text_rect = self.text_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
+        self.rect = pygame.Rect(SCREEN_WIDTH // 2 - width // 2, SCREEN_HEIGHT // 2 - height // 2, width, height)
+        self.running = True
+        self.close_button = Button('', self.rect.x + self.width - 140, self.rect.y + self.height - 40, 120, 30,
+                                   RED, (200, 0, 0), self.close, close_image)
+        self.background_image = background_image
+
+    def close(self):
+        self.running = False
+
+    def run(self):
+        while self.running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+                self.close_button.handle_event(event)
+            if self.background_image:
+                self.screen.blit(self.background_image, self.rect)
+            else:
+                pygame.draw.rect(self.screen, GRAY, self.rect)
+            self.screen.blit(self.text_surface, self.text_rect)
+            self.close_button.draw(self.screen)
+            pygame.display.flip()
+
+
+class StartWindow:
+    def __init__(self, screen):
+        self.screen = screen
+        self.buttons = []
+        self.running = True
+        self.background_image = load_image('dungeon_entrance.jpg')
+        self.table_image = pygame.transform.scale(load_image('tables.jpg', colorkey=-1), (200, 50))
+        self.beton_image = pygame.transform.scale(load_image('beton.jpg'), (400, 200))
+        self.return_image = pygame.transform.scale(load_image('return.jpg'), (120, 30))
+        self.start_game_table_rect = None
+        self.create_buttons()
+        self.popup_window = None
+        self.animation_start_time = 0
+        self.animation_duration = 2
+        self.animating = False
+
+    def create_buttons(self):
+        button_width = 200
+        button_height = 50
+        start_x = SCREEN_WIDTH // 2 - button_width // 2
+        button_y = 200
+        space = 80
+        self.buttons.append(
+            Button('Начать игру', start_x, button_y, button_width, button_height, GREEN, (0, 200, 0), self.start_game,
+                   self.table_image))
+        self.start_game_table_rect = self.buttons[0].rect
+        button_y += space
+        self.buttons.append(
+            Button('О игре', start_x, button_y, button_width, button_height, BLUE, (0, 0, 200), self.show_about,
+                   self.table_image))
+        button_y += space
+        self.buttons.append(Button('Об авторах', start_x, button_y, button_width, button_height, GOLD, (200, 170, 0),
+                                   self.show_authors, self.table_image))
+
+    def start_game(self):
+        self.running = False
+
+    def show_about(self):
+        self.popup_window = PopupWindow(self.screen, "Здесь будет информация об игре", 400, 200,
+                                        self.beton_image, self.return_image)
+        self.popup_window.run()
+        self.popup_window = None
+
+    def show_authors(self):
+        self.popup_window = PopupWindow(self.screen, "Здесь информация об авторах", 400, 200,
+                                        self.beton_image, self.return_image)
+        self.popup_window.run()
+        self.popup_window = None
+
+    def run(self):
+        while self.running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+                if self.running:
+                    for button in self.buttons:
+                        button.handle_event(event)
+            self.screen.fill(BLACK)
+            self.screen.blit(self.background_image, ((SCREEN_WIDTH - self.background_image.get_width()) // 2, 0))
+            if self.running:
+                for button in self.buttons:
+                    button.draw(self.screen)
+            pygame.display.flip()
+
+
+font_size = 40
+
+font1 = pygame.font.Font(None, font_size)
+font2 = pygame.font.Font("data/DS-DIGIB.TTF", font_size)
+
+clock = pygame.time.Clock()
+start_time = pygame.time.get_ticks()
+game_duration = 100
+
+level = 1
+digit_width = 20
+digit_height = 20
+
+PAUSE_BUTTON_X = 720
+PAUSE_BUTTON_Y = 780
+PAUSE_BUTTON_WIDTH = 120
+PAUSE_BUTTON_HEIGHT = 40
+
+y_offset = SCREEN_HEIGHT - digit_height
+HUD_RECT = pygame.Rect(0, 700, SCREEN_WIDTH, SCREEN_HEIGHT - 700)
+
+
+class GlyphAtlas:
+    def __init__(self, font):
+        self.font = font
+        # Каждая строка (цифра или подпись) растеризуется шрифтом один раз на цвет
+        self.glyphs = {}
+        self.render_time = 0.0
+        self.render_calls = 0
+
+    def get(self, text, color):
+        surface = self.glyphs.get((text, color))
+        if surface is None:
+            start = time.perf_counter()
+            surface = self.font.render(text, True, color)
+            self.render_time += time.perf_counter() - start
+            self.render_calls += 1
+            self.glyphs[(text, color)] = surface
+        return surface
+
+    def preload(self, texts, color):
+        for text in texts:
+            self.get(text, color)
+
+
+digit_atlas = GlyphAtlas(font2)
+text_atlas = GlyphAtlas(font1)
+digit_atlas.preload('0123456789', LIGHT_YELLOW)
+text_atlas.preload(["TIME:", "LEVEL:", "STARS LEFT:"], YELLOW)
+text_atlas.preload(["PAUSE", "RESUME"], WHITE)
+
+PAUSE_BUTTON_RECT = pygame.Rect(PAUSE_BUTTON_X, PAUSE_BUTTON_Y, PAUSE_BUTTON_WIDTH, PAUSE_BUTTON_HEIGHT)
+
+
+def draw_digit(screen, number, x, y, color):
+    num_str = str(number).zfill(3)
+    for i, digit in enumerate(num_str):
+        digit_surface = digit_atlas.get(digit, color)
+        digit_rect = digit_surface.get_rect(center=(x + digit_width * i + digit_width // 2, y + digit_height // 2))
+        screen.blit(digit_surface, digit_rect)
+
+
+def draw_text(screen, text, x, y, color):
+    text_surface = text_atlas.get(text, color)
+    screen.blit(text_surface, (x, y))
+
+
+def draw_clock_face(screen, x, y, width, height, color):
+    pygame.draw.rect(screen, color, (x, y, width, height))
+
+
+def draw_pause_button(screen, is_paused):
+    text = "PAUSE" if not is_paused else "RESUME"
+    text_surface = text_atlas.get(text, WHITE)
+    button_rect = PAUSE_BUTTON_RECT
+    pygame.draw.rect(screen, GRAY, button_rect)
+    text_rect = text_surface.get_rect(center=button_rect.center)
+    screen.blit(text_surface, text_rect)
+    return button_rect
+
+
+class Counter:
+    def __init__(self, x, y, digit_x, digit_y):
+        self.rect = pygame.Rect(x, y, 70, 40)
+        self.digit_x = digit_x
+        self.digit_y = digit_y
+        self.value = None
+
+    def draw(self, screen, value):
+        if value == self.value:
+            return None
+        self.value = value
+        draw_clock_face(screen, *self.rect, BLUE)
+        draw_digit(screen, value, self.digit_x, self.digit_y, LIGHT_YELLOW)
+        return self.rect
+
+
+class Hud:
+    def __init__(self):
+        self.time_counter = Counter(790, 710, 794, 720)
+        self.level_counter = Counter(275, 775, 282, 782)
+        self.chips_counter = Counter(275, 710, 280, 720)
+        self.is_paused = None
+        self.labels_drawn = False
+        self.draw_time = 0.0
+
+    def invalidate(self):
+        self.time_counter.value = None
+        self.level_counter.value = None
+        self.chips_counter.value = None
+        self.is_paused = None
+        self.labels_drawn = False
+
+    def text_time(self):
+        # Время растеризации шрифтов и полное время отрисовки HUD
+        return digit_atlas.render_time + text_atlas.render_time, self.draw_time
+
+    def draw(self, screen, time_left, level, chips_left, is_paused):
+        start = time.perf_counter()
+        dirty_rects = []
+        if not self.labels_drawn:
+            draw_text(screen, "TIME:", 700, 760 - font_size, YELLOW)
+            draw_text(screen, "LEVEL:", 90, 780, YELLOW)
+            draw_text(screen, "STARS LEFT:", 90, 760 - font_size, YELLOW)
+            self.labels_drawn = True
+            dirty_rects.append(HUD_RECT)
+        for counter, value in ((self.time_counter, time_left), (self.level_counter, level),
+                               (self.chips_counter, chips_left)):
+            rect = counter.draw(screen, value)
+            if rect:
+                dirty_rects.append(rect)
+        if is_paused != self.is_paused:
+            self.is_paused = is_paused
+            dirty_rects.append(draw_pause_button(screen, is_paused))
+        self.draw_time += time.perf_counter() - start
+        return dirty_rects
+
+
+overlay_atlas = GlyphAtlas(pygame.font.Font(None, 24))
+overlay_atlas.preload('0123456789. /ms', WHITE)
+OVERLAY_RECT = pygame.Rect(10, 10, 220, 12 * 20 + 10)
+
+
+def draw_atlas_value(screen, atlas, text, color, right, y):
+    # Число меняется каждый кадр, поэтому собирается из глифов по символу, выровненных вправо
+    glyphs = [atlas.get(char, color) for char in text]
+    x = right - sum(glyph.get_width() for glyph in glyphs)
+    for glyph in glyphs:
+        screen.blit(glyph, (x, y))
+        x += glyph.get_width()
+
+
+def draw_profiler_overlay(screen, profiler, clock, hud):
+    # Средние времена фаз по кольцевому буферу профилировщика, в миллисекундах
+    lines = [('fps', f"{clock.get_fps():.1f}")]
+    lines += [(name, f"{value:.2f} ms") for name, value in profiler.averages().items()]
+    lines.append(('tile cache', f"{tile_cache.hits} / {tile_cache.misses}"))
+    # Суммарное время с запуска: растеризация шрифтов HUD и вся отрисовка HUD
+    render_time, draw_time = hud.text_time()
+    lines.append(('text render', f"{1000 * render_time:.1f} ms"))
+    lines.append(('hud total', f"{1000 * draw_time:.1f} ms"))
+    pygame.draw.rect(screen, BLACK, OVERLAY_RECT)
+    for i, (name, value) in enumerate(lines):
+        y = OVERLAY_RECT.y + 5 + 20 * i
+        screen.blit(overlay_atlas.get(name, WHITE), (OVERLAY_RECT.x + 5, y))
+        draw_atlas_value(screen, overlay_atlas, value, WHITE, OVERLAY_RECT.right - 5, y)
+    return OVERLAY_RECT
+
+
+def main():
+    level = 1
+    clock = pygame.time.Clock()
+    size = SCREEN_WIDTH, SCREEN_HEIGHT
+    screen = pygame.display.set_mode(size)
+    pygame.display.set_caption('Level Mover')
+
+    start_window = StartWindow(screen)
+    start_window.run()
+
+    is_paused = False
+    game_over = False
+    level_complete = False
+    full_redraw = True
+    trajectory = 'trajectory.txt'
+    hud = Hud()
+
+    if not start_window.running:
+        board = Board(BOARD_WIDTH, BOARD_HEIGHT)
+        board.load_level(LEVEL_FILE, trajectory)
+
+        inventory = Inventory(7, 1)
+        inventory.set_view(board.left + TILE_SIZE,
+                           board.top + board.cell_size * board.height + TILE_SIZE, TILE_SIZE)
+
+        profiler = Profiler()
+        show_profiler = False
+        lag = 0.0
+        clock.tick()
+        running = True
+        while running:
+            # Накопленное время расходуется тиками фиксированной длины, остаток сглаживает отрисовка
+            frame_time = min(clock.tick(FRAME_RATE) / 1000, MAX_FRAME_TIME)
+            with profiler.phase('events'):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        running = False
+                    mouse_pos = pygame.mouse.get_pos()
+                    if PAUSE_BUTTON_RECT.collidepoint(mouse_pos) and pygame.mouse.get_pressed()[0]:
+                        is_paused = not is_paused
+                    if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                        show_profiler = not show_profiler
+                        full_redraw = True
+                    if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                        profiler.dump_csv(PROFILE_FILE)
+                    if event.type == pygame.KEYDOWN and not is_paused and not game_over and not level_complete:
+                        dx = 0
+                        dy = 0
+                        if event.key == pygame.K_d:
+                            dx = -1
+                        if event.key == pygame.K_s:
+                            dy = -1
+                        if event.key == pygame.K_w:
+                            dy = 1
+                        if event.key == pygame.K_a:
+                            dx = 1
+                        with profiler.phase('move_level'):
+                            board.move_level(dx, dy, inventory)
+                        game_over = board.state.game_over
+                        level_complete = board.check_portal_collision(screen, inventory)
+                        if level_complete:
+                            # После всплывающего окна экран перерисовывается целиком
+                            full_redraw = True
+
+                    if event.type == pygame.KEYDOWN and game_over:
+                        if event.key == pygame.K_RETURN:
+                            game_over = False
+                            board.restart_level()
+                    if event.type == pygame.KEYDOWN and level_complete:
+                        if event.key == pygame.K_RETURN:
+                            level_complete = False
+                            board.restart_level()
+
+            ticks = 0
+            if not is_paused and not game_over and not level_complete:
+                # Тик движка: отсчёт времени, монстры и столкновение с ними
+                lag += frame_time
+                with profiler.phase('move_monsters'):
+                    while lag >= TICK_TIME and not board.state.game_over:
+                        board.move_monsters()
+                        lag -= TICK_TIME
+                        ticks += 1
+                game_over = board.state.game_over
+
+            if full_redraw:
+                screen.fill(BLACK)
+                hud.invalidate()
+
+            # Счётчики HUD перерисовываются только при изменении значения
+            with profiler.phase('hud'):
+                dirty_rects = hud.draw(screen, board.state.time_left, level, board.state.chips_left, is_paused)
+            with profiler.phase('draw_level'):
+                dirty_rects += [board.draw_level(screen, lag / TICK_TIME), inventory.screen_rect()]
+                inventory.render(screen)
+            if game_over:
+                draw_text(screen, "GAME OVER!",
+                          SCREEN_WIDTH // 2 - 120, SCREEN_HEIGHT // 2 - 50, RED)
+                draw_text(screen, "Press Enter to restart", SCREEN_WIDTH // 2 - 150,
+                          SCREEN_HEIGHT // 2, RED)
+                inventory.items = []
+            if show_profiler:
+                with profiler.phase('overlay'):
+                    dirty_rects.append(draw_profiler_overlay(screen, profiler, clock, hud))
+            with profiler.phase('flip'):
+                if DIRTY_RECT_UPDATES and not full_redraw:
+                    pygame.display.update(dirty_rects)
+                else:
+                    pygame.display.flip()
+                    full_redraw = False
+            profiler.end_frame(ticks)
+
+    pygame.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import csv
+import time
+from collections import deque
+from contextlib import contextmanager
+
+PHASES = ('events', 'move_level', 'move_monsters', 'draw_level', 'hud', 'overlay', 'flip')
+HISTORY = 600
+
+
+class Profiler:
+    def __init__(self, phases=PHASES, history=HISTORY):
+        self.phases = phases
+        # Кольцевой буфер последних кадров: время фаз, число тиков движка и длительность кадра
+        self.frames = deque(maxlen=history)
+        self.current = dict.fromkeys(phases, 0.0)
+        self.ticks = 0
+        self.inner = 0.0
+        self.frame_start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        # Время вложенной фазы не засчитывается внешней: move_level вызывается внутри обработки событий
+        start = time.perf_counter()
+        outer = self.inner
+        self.inner = 0.0
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.current[name] += elapsed - self.inner
+            self.inner = outer + elapsed
+
+    def end_frame(self, ticks):
+        now = time.perf_counter()
+        self.frames.append(tuple(self.current[name] for name in self.phases) + (ticks, now - self.frame_start))
+        self.frame_start = now
+        self.current = dict.fromkeys(self.phases, 0.0)
+
+    def averages(self):
+        # Средние по буферу в миллисекундах: фазы, затем кадр целиком
+        if not self.frames:
+            return {}
+        columns = list(zip(*self.frames))
+        names = self.phases + ('frame',)
+        values = columns[:len(self.phases)] + [columns[-1]]
+        return {name: 1000 * sum(column) / len(column) for name, column in zip(names, values)}
+
+    def dump_csv(self, path):
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow([name + '_ms' for name in self.phases] + ['ticks', 'frame_ms'])
+            for frame in self.frames:
+                *phases, ticks, total = frame
+                writer.writerow([f"{1000 * value:.3f}" for value in phases] + [ticks, f"{1000 * total:.3f}"])
@@ -0,0 +1,390 @@
+import argparse
+import heapq
+import time
+from array import array
+from collections import deque
+
+import engine
+
+PAR_MOVES_PER_SECOND = 2
+MAX_STATES = 100000
+# Сколько раскладок (флаги, песок, инвентарь) держать с готовой картой клеток для обхода
+LAYOUT_CACHE = 4096
+ESTIMATE_CACHE = 1 << 20
+# Доля лимита состояний на первый проход --prune-sand, без толчков песка
+FROZEN_SHARE = 0.25
+UNREACHABLE = 1 << 30
+# Путь записывается теми же клавишами, что понимает engine.GameState.run
+MOVES = tuple(engine.DIRECTIONS.items())
+
+
+class Solution:
+    def __init__(self, solvable, path, states, elapsed, time_limit, moves_per_second):
+        # solvable - True, False или None, если кончился лимит состояний
+        self.solvable = solvable
+        self.path = path
+        self.moves = len(path) if path is not None else None
+        self.states = states
+        self.elapsed = elapsed
+        self.par_time = self.moves / moves_per_second if path is not None else None
+        self.within_time = self.par_time is not None and self.par_time <= time_limit
+
+    def __str__(self):
+        if self.solvable is None:
+            return f"unknown: state limit reached after {self.states} states ({self.elapsed:.2f} s)"
+        if not self.solvable:
+            return f"unsolvable: {self.states} states searched ({self.elapsed:.2f} s)"
+        budget = 'within' if self.within_time else 'over'
+        return (f"solvable in {self.moves} moves, par {self.par_time:.0f} s ({budget} the time limit), "
+                f"{self.states} states ({self.elapsed:.2f} s)\n{self.path}")
+
+
+class Puzzle:
+    def __init__(self, level, prune_sand=False):
+        # Карта дополняется рамкой пустоты, а за ней стеной: обходить уровень дальше рамки никогда не короче
+        self.width = level.width + 4
+        self.height = level.height + 4
+        size = self.width * self.height
+        self.walls = bytearray(size)
+        self.blocks_sand = bytearray(b'\x01') * size
+        self.portals = []
+        self.bits = {}
+        self.key_indicators = {}
+        self.door_indicators = {}
+        self.chip_cells = []
+        self.chip_mask = 0
+        self.key_mask = 0
+        self.door_mask = 0
+        self.water_mask = 0
+        sands = []
+        flags = 0
+        self.start = None
+        for y in range(level.height):
+            for x in range(level.width):
+                code = chr(level.tiles[y * level.width + x])
+                cell = (y + 2) * self.width + x + 2
+                if code == '#':
+                    self.walls[cell] = 1
+                elif code == 'O':
+                    self.portals.append(cell)
+                elif code != ' ':
+                    self.blocks_sand[cell] = 0
+                if code == 'S':
+                    sands.append(cell)
+                elif code in 'KkDd*W':
+                    bit = 1 << len(self.bits)
+                    self.bits[cell] = bit
+                    flags |= bit
+                    if code in 'Kk':
+                        self.key_mask |= bit
+                        self.key_indicators[cell] = 1 << (engine.INDICATORS[code] - 1)
+                    elif code in 'Dd':
+                        self.door_mask |= bit
+                        self.door_indicators[cell] = 1 << (engine.INDICATORS[code] - 1)
+                    elif code == '*':
+                        self.chip_mask |= bit
+                        self.chip_cells.append((bit, cell))
+                    else:
+                        self.water_mask |= bit
+        for cell in range(size):
+            x, y = cell % self.width, cell // self.width
+            if x in (0, self.width - 1) or y in (0, self.height - 1):
+                self.walls[cell] = 1
+        for code, x, y in level.spawns:
+            if code == ord('P'):
+                self.start = (y + 2) * self.width + x + 2
+        self.offsets = [(key, dy * self.width + dx) for key, (dx, dy) in MOVES]
+        self.cell_bits = (size - 1).bit_length()
+        # Клетки песка пакуются массивом одинаковых слотов
+        self.sand_slot = 'H' if size <= 1 << 16 else 'I'
+        self.sand_bits = 8 * array(self.sand_slot).itemsize * len(sands)
+        self.initial = (self.start, 0, 0, flags, tuple(sorted(sands)))
+        # Для эвристики - расстояния по карте без учёта дверей, песка и воды: настоящий путь не короче
+        self.portal_distance = self.distances(self.portals)
+        self.chip_distance = [self.distances([cell]) for _, cell in self.chip_cells]
+        self.chip_between = [[distance[cell] for _, cell in self.chip_cells] for distance in self.chip_distance]
+        self.sand_distance = self.sand_to_water() if prune_sand else None
+        self.freeze_sand = False
+        self.layouts = {}
+        self.estimates = {}
+        # Свободные клетки и клетки с событиями хранятся битовыми масками, обход идёт сразу слоями
+        self.open_cells = sum(1 << cell for cell in range(size) if not self.walls[cell])
+
+    def sand_to_water(self):
+        # Сколько толчков нужно песку до ближайшей воды, если не мешают двери и другой песок.
+        # Песок в углу стен (и любой другой, что уже не дойдёт до воды) остаётся без расстояния
+        distance = [UNREACHABLE] * len(self.walls)
+        queue = deque(cell for cell, bit in self.bits.items() if bit & self.water_mask)
+        for cell in queue:
+            distance[cell] = 0
+        while queue:
+            cell = queue.popleft()
+            for _, offset in self.offsets:
+                sand = cell - offset
+                if distance[sand] == UNREACHABLE and not self.walls[sand] and not self.blocks_sand[sand] and \
+                        not self.walls[sand - offset]:
+                    distance[sand] = distance[cell] + 1
+                    queue.append(sand)
+        return distance
+
+    def distances(self, sources):
+        distance = [UNREACHABLE] * len(self.walls)
+        queue = deque(sources)
+        for cell in sources:
+            distance[cell] = 0
+        while queue:
+            cell = queue.popleft()
+            for _, offset in self.offsets:
+                target = cell + offset
+                if not self.walls[target] and distance[target] == UNREACHABLE:
+                    distance[target] = distance[cell] + 1
+                    queue.append(target)
+        return distance
+
+    def encode(self, state):
+        # Всё состояние упаковано в одно целое: флаги клеток, инвентарь, игрок и песок.
+        # Сколько песка осталось, видно по флагам залитой воды, так что слоты без дополнения однозначны
+        player, inventory, count, flags, sands = state
+        key = (((flags << 5) | (count << 2) | inventory) << self.cell_bits) | player
+        return (key << self.sand_bits) | int.from_bytes(array(self.sand_slot, sands).tobytes(), 'little')
+
+    def heuristic(self, state):
+        # Нужно обойти каждую оставшуюся фишку (и каждую пару фишек) и дойти до портала.
+        # Оценка зависит только от игрока и оставшихся фишек, её делят состояния с разным песком и ключами
+        player, _, _, flags, _ = state
+        key = (player, flags & self.chip_mask)
+        best = self.estimates.get(key)
+        if best is not None:
+            return best
+        best = self.portal_distance[player]
+        # Для каждой оставшейся фишки: путь от игрока до неё и от неё до портала
+        left = [(self.chip_distance[i][player], self.portal_distance[cell], i)
+                for i, (bit, cell) in enumerate(self.chip_cells) if flags & bit]
+        for to_chip, to_portal, _ in left:
+            if to_chip + to_portal > best:
+                best = to_chip + to_portal
+        for n, (first_to, first_portal, i) in enumerate(left):
+            between = self.chip_between[i]
+            for second_to, second_portal, j in left[n + 1:]:
+                via_first = first_to + second_portal
+                via_second = second_to + first_portal
+                estimate = between[j] + (via_first if via_first < via_second else via_second)
+                if estimate > best:
+                    best = estimate
+        if len(self.estimates) >= ESTIMATE_CACHE:
+            self.estimates.clear()
+        self.estimates[key] = best
+        return best
+
+    def is_goal(self, state):
+        return state[0] in self.portals and not state[3] & self.chip_mask
+
+    def step(self, state, offset):
+        # Те же правила, что и в engine.GameState.move, но на упакованном состоянии
+        player, inventory, count, flags, sands = state
+        target = player + offset
+        if self.walls[target]:
+            return None
+        bit = self.bits.get(target, 0)
+        present = flags & bit
+        if present & self.door_mask:
+            if not inventory & self.door_indicators[target]:
+                return None
+            flags ^= bit
+        elif target in sands:
+            sand = target + offset
+            if self.walls[sand] or self.blocks_sand[sand] or sand in sands:
+                return None
+            sand_bit = self.bits.get(sand, 0)
+            if flags & sand_bit & ~self.water_mask:
+                return None
+            if self.freeze_sand or \
+                    self.sand_distance is not None and self.sand_distance[sand] >= self.sand_distance[target]:
+                # Песок толкается только ближе к воде
+                return None
+            rest = [cell for cell in sands if cell != target]
+            if flags & sand_bit:
+                flags ^= sand_bit
+            else:
+                rest.append(sand)
+            sands = tuple(sorted(rest))
+        elif present & self.key_mask:
+            if count < engine.INVENTORY_SIZE:
+                inventory |= self.key_indicators[target]
+                count += 1
+            flags ^= bit
+        elif present & self.chip_mask:
+            flags ^= bit
+        elif present & self.water_mask:
+            # Шаг в воду - проигрыш, такие ходы не рассматриваются
+            return None
+        return target, inventory, count, flags, sands
+
+    def layout(self, state):
+        # Маски для обхода общие у состояний с одними флагами, песком и инвентарём:
+        # свободные клетки и клетки с событием. Там же запоминаются уже посчитанные события
+        _, inventory, count, flags, sands = state
+        key = (flags, sands, inventory, count)
+        layout = self.layouts.get(key)
+        if layout is None:
+            if len(self.layouts) >= LAYOUT_CACHE:
+                self.layouts.clear()
+            events = 0
+            for cell, bit in self.bits.items():
+                if flags & bit:
+                    events |= 1 << cell
+            for cell in sands:
+                events |= 1 << cell
+            if not flags & self.chip_mask:
+                for cell in self.portals:
+                    events |= 1 << cell
+            layout = self.layouts[key] = (self.open_cells & ~events, events, {})
+        return layout
+
+    def walk(self, state):
+        # Обход свободных клеток от игрока; состояние меняется только на клетке с событием:
+        # дверь, ключ, фишка, толчок песка или портал, когда фишек не осталось
+        free, events, known = self.layout(state)
+        seen = frontier = 1 << state[0]
+        moves = 0
+        while frontier:
+            moves += 1
+            reached = 0
+            for move, offset in self.offsets:
+                shifted = frontier << offset if offset > 0 else frontier >> -offset
+                reached |= shifted
+                hits = shifted & events
+                while hits:
+                    lowest = hits & -hits
+                    hits ^= lowest
+                    cell = lowest.bit_length() - 1 - offset
+                    event = (cell, offset)
+                    if event in known:
+                        following = known[event]
+                    else:
+                        following = known[event] = self.step((cell,) + state[1:], offset)
+                    if following is not None:
+                        yield moves, following, cell, move
+            frontier = reached & free & ~seen
+            seen |= frontier
+
+    def route(self, state, goal):
+        # Кратчайший путь по свободным клеткам, нужен только для восстановления ответа
+        player, _, _, flags, sands = state
+        chips_left = flags & self.chip_mask
+        parents = {player: None}
+        queue = deque([player])
+        while goal not in parents:
+            cell = queue.popleft()
+            for move, offset in self.offsets:
+                target = cell + offset
+                if target in parents or self.walls[target] or flags & self.bits.get(target, 0) or \
+                        target in sands or (not chips_left and target in self.portals):
+                    continue
+                parents[target] = (cell, move)
+                queue.append(target)
+        moves = []
+        while parents[goal] is not None:
+            goal, move = parents[goal]
+            moves.append(move)
+        return ''.join(reversed(moves))
+
+    def search(self, use_heuristic=True, max_states=MAX_STATES):
+        start = self.initial
+        if start[0] is None or not self.portals:
+            return None, False, 1
+        start_key = self.encode(start)
+        # parents - откуда пришли в состояние (клетка перед событием и ход), best - длина лучшего пути
+        parents = {start_key: None}
+        best = {start_key: 0}
+        if self.heuristic(start) >= UNREACHABLE:
+            return None, False, 1
+        # При равной оценке первым раскрывается состояние с более длинным пройденным путём
+        frontier = [(self.heuristic(start) if use_heuristic else 0, 0, 0, start_key, start)]
+        counter = 0
+        while frontier:
+            _, negative_moves, _, key, state = heapq.heappop(frontier)
+            moves = -negative_moves
+            if moves > best[key]:
+                continue
+            if moves and self.is_goal(state):
+                return self.path(parents, key), True, len(best)
+            for cost, following, cell, move in self.walk(state):
+                following_key = self.encode(following)
+                total = moves + cost
+                if best.get(following_key, total + 1) <= total:
+                    continue
+                remaining = self.heuristic(following)
+                if remaining >= UNREACHABLE:
+                    # Фишку или портал уже не достать
+                    continue
+                if following_key not in best and len(best) >= max_states:
+                    return None, None, len(best)
+                parents[following_key] = (key, cell, move)
+                best[following_key] = total
+                counter += 1
+                estimate = total + remaining if use_heuristic else total
+                heapq.heappush(frontier, (estimate, -total, counter, following_key, following))
+        return None, False, len(best)
+
+    def path(self, parents, key):
+        events = []
+        while parents[key] is not None:
+            key, cell, move = parents[key]
+            events.append((cell, move))
+        # Путь проигрывается заново от начала: переход по свободным клеткам и ход на событие
+        state = self.initial
+        moves = []
+        for cell, move in reversed(events):
+            moves.append(self.route(state, cell) + move)
+            state = self.step((cell,) + state[1:], dict(self.offsets)[move])
+        return ''.join(moves)
+
+
+def verify(level, path):
+    # Повтор найденного пути на движке игры, монстры не учитываются
+    state = engine.GameState(level, {})
+    state.monsters = engine.MonsterSwarm([])
+    for key in path:
+        state.move(*engine.DIRECTIONS[key])
+    return state.level_complete
+
+
+def solve(level, use_heuristic=True, max_states=MAX_STATES, time_limit=engine.TIME_LIMIT,
+          moves_per_second=PAR_MOVES_PER_SECOND, prune_sand=False):
+    if not isinstance(level, engine.CompiledLevel):
+        level = engine.compile_level(level)
+    start = time.perf_counter()
+    puzzle = Puzzle(level, prune_sand)
+    searched = 0
+    if prune_sand:
+        # Сначала без толчков песка и с частью лимита: если так уровень проходится, песок трогать незачем
+        puzzle.freeze_sand = True
+        path, solvable, searched = puzzle.search(use_heuristic, max(1, int(max_states * FROZEN_SHARE)))
+        puzzle.freeze_sand = False
+        puzzle.layouts.clear()
+    if not prune_sand or not solvable:
+        path, solvable, states = puzzle.search(use_heuristic, max(1, max_states - searched))
+        searched += states
+    return Solution(solvable, path, searched, time.perf_counter() - start, time_limit, moves_per_second)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hurry Up level solver (monsters are not simulated)')
+    parser.add_argument('level', nargs='?', default='data/level.txt')
+    parser.add_argument('--bfs', action='store_true', help='plain breadth-first search instead of A*')
+    parser.add_argument('--max-states', type=int, default=MAX_STATES)
+    parser.add_argument('--prune-sand', action='store_true',
+                        help='push sand only towards water (faster, may miss solutions or return a longer path)')
+    parser.add_argument('--speed', type=float, default=PAR_MOVES_PER_SECOND, help='player moves per second')
+    args = parser.parse_args()
+
+    level = engine.open_level(args.level)
+    solution = solve(level, not args.bfs, args.max_states, moves_per_second=args.speed, prune_sand=args.prune_sand)
+    print(solution)
+    if solution.solvable and not verify(level, solution.path):
+        print("warning: path does not complete the level when replayed on the engine")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Модули игры лежат плоско в каталоге выше тестов
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+import engine
+
+LEVEL = ['#######',
+         '#P.S.W#',
+         '#K*.M.#',
+         '[[#O###']
+
+
+def write_level(path, rows):
+    path.write_text('\n'.join(rows) + '\n')
+    return str(path)
+
+
+def same_level(first, second):
+    return (first.width, first.height, bytes(first.tiles), first.spawns, first.chips) == \
+        (second.width, second.height, bytes(second.tiles), second.spawns, second.chips)
+
+
+def test_compiled_copy_round_trips(tmp_path):
+    path = write_level(tmp_path / 'level.txt', LEVEL)
+    compiled = engine.open_level(path)
+    assert compiled.buffer is None
+    assert os.path.exists(path + engine.COMPILED_SUFFIX)
+
+    cached = engine.open_level(path)
+    assert cached.buffer is not None
+    assert same_level(cached, compiled)
+    assert same_level(cached, engine.compile_level(LEVEL))
+    # Из кэша и из текста собирается одно и то же состояние игры
+    assert bytes(engine.GameState(cached, {}).grid.tiles) == bytes(engine.GameState(LEVEL, {}).grid.tiles)
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.tmp')] == []
+
+
+def test_same_size_edit_with_kept_mtime_recompiles(tmp_path):
+    path = write_level(tmp_path / 'level.txt', LEVEL)
+    engine.open_level(path)
+    stat = os.stat(path)
+    # Игрок и пол меняются местами: размер тот же, mtime возвращается как после cp -p
+    edited = [LEVEL[0], '#.PS.W#'] + LEVEL[2:]
+    write_level(tmp_path / 'level.txt', edited)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    level = engine.open_level(path)
+    assert level.buffer is None
+    assert same_level(level, engine.compile_level(edited))
+    assert engine.open_level(path).buffer is not None
+
+
+def test_broken_compiled_copy_is_rebuilt(tmp_path):
+    path = write_level(tmp_path / 'level.txt', LEVEL)
+    engine.open_level(path)
+    with open(path + engine.COMPILED_SUFFIX, 'r+b') as file:
+        file.truncate(engine.COMPILED_HEADER.size + 3)
+
+    level = engine.open_level(path)
+    assert level.buffer is None
+    assert same_level(level, engine.compile_level(LEVEL))
+    assert engine.open_level(path).buffer is not None
+
+
+def test_non_ascii_cell_is_rejected(tmp_path):
+    path = write_level(tmp_path / 'level.txt', [LEVEL[0], '#P.é.W#'] + LEVEL[2:])
+    with pytest.raises(UnicodeEncodeError):
+        engine.open_level(path)
+    assert not os.path.exists(path + engine.COMPILED_SUFFIX)
@@ -0,0 +1,134 @@
+import engine
+
+
+def make_state(*rows, trajectories=None):
+    return engine.GameState(list(rows), trajectories or {})
+
+
+def test_sand_is_pushed_onto_floor():
+    state = make_state('#######',
+                       '#PS..W#',
+                       '#######')
+    changes = state.move(1, 0)
+    assert changes == [('push', 2, 1, 3, 1), ('player', 2, 1)]
+    assert state.grid.get(2, 1) == '.'
+    assert state.grid.get(3, 1) == 'S'
+
+
+def test_sand_fills_water():
+    state = make_state('######',
+                       '#PSW.#',
+                       '######')
+    changes = state.move(1, 0)
+    assert changes == [('fill', 2, 1, 3, 1), ('player', 2, 1)]
+    assert state.grid.get(3, 1) == '.'
+    state.move(1, 0)
+    assert state.player == (3, 1)
+    assert not state.game_over
+
+
+def test_blocked_sand_stops_the_player():
+    for blocker in '#SK*DO ':
+        state = make_state('######',
+                           f'#PS{blocker}.#',
+                           '######')
+        assert state.move(1, 0) == []
+        assert state.player == (1, 1)
+        assert state.grid.get(2, 1) == 'S'
+
+
+def test_door_needs_matching_key():
+    state = make_state('#####',
+                       '#PD.#',
+                       '#####')
+    assert state.move(1, 0) == []
+    assert state.player == (1, 1)
+
+    state = make_state('######',
+                       '#PkD.#',
+                       '######')
+    state.move(1, 0)
+    assert state.move(1, 0) == []
+    assert state.player == (2, 1)
+
+    state = make_state('######',
+                       '#PKD.#',
+                       '######')
+    assert state.move(1, 0) == [('key', 2, 1), ('player', 2, 1)]
+    assert state.move(1, 0) == [('door', 3, 1), ('player', 3, 1)]
+    assert state.grid.get(3, 1) == '.'
+    # Ключ остаётся в инвентаре и открывает следующие двери
+    assert state.inventory == [engine.INDICATORS['K']]
+
+
+def test_inventory_holds_seven_keys():
+    state = make_state('#' * 12,
+                       '#PKKKKKKKKk#',
+                       '#' * 12)
+    for _ in range(9):
+        state.move(1, 0)
+    assert len(state.inventory) == engine.INVENTORY_SIZE
+    assert engine.INDICATORS['k'] not in state.inventory
+    # Лишние ключи всё равно подбираются с карты
+    assert all(state.grid.get(x, 1) == '.' for x in range(2, 11))
+
+
+def test_water_ends_the_game():
+    state = make_state('#####',
+                       '#PW.#',
+                       '#####')
+    assert state.move(1, 0) == [('player', 2, 1)]
+    assert state.game_over
+    assert state.move(1, 0) == []
+    assert state.player == (2, 1)
+
+
+def test_portal_needs_all_chips():
+    state = make_state('#####',
+                       '#PO*#',
+                       '#####')
+    state.move(1, 0)
+    assert not state.level_complete
+    assert state.move(1, 0) == [('chip', 3, 1), ('player', 3, 1)]
+    assert state.chips_left == 0
+    state.move(-1, 0)
+    assert state.level_complete
+    assert state.move(-1, 0) == []
+
+
+def test_countdown_ticks_once_per_second():
+    state = make_state('#####',
+                       '#P.*#',
+                       '#####')
+    for _ in range(engine.TICKS_PER_SECOND - 1):
+        state.tick()
+    assert state.time_left == engine.TIME_LIMIT
+    state.tick()
+    assert state.time_left == engine.TIME_LIMIT - 1
+
+    # Без фишек отсчёт стоит
+    state = make_state('####',
+                       '#P.#',
+                       '####')
+    for _ in range(engine.TICKS_PER_SECOND * 3):
+        state.tick()
+    assert state.time_left == engine.TIME_LIMIT
+
+
+def test_monster_reaching_the_player_ends_the_game():
+    size = engine.TILE_SIZE
+    state = make_state('######',
+                       '#P..M#',
+                       '######', trajectories={(4, 1): [[4 * size, size], [size, size]]})
+    state.run('.' * 100)
+    assert state.game_over
+    assert state.monster_hit()
+
+
+def test_swarm_interpolates_between_ticks():
+    swarm = engine.MonsterSwarm([[[0, 0], [100, 0]]])
+    swarm.update()
+    bounds = (-100, -100, 1000, 1000)
+    assert swarm.visible(*bounds, 0.0) == [[0, 0]]
+    assert swarm.visible(*bounds, 0.5) == [[2, 0]]
+    assert swarm.visible(*bounds) == [[4, 0]]
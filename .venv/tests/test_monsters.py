@@ -0,0 +1,52 @@
+import math
+import random
+
+import engine
+
+
+class ScalarMonster:
+    # Прежний Monster.update, по одному монстру за раз
+    def __init__(self, trajectory, speed=engine.MONSTER_SPEED):
+        self.trajectory = trajectory
+        self.current_point_index = 0
+        self.next_point_index = 1 % len(trajectory)
+        self.speed = speed
+        self.x, self.y = trajectory[0]
+        self.rect = (math.floor(self.x + 0.5), math.floor(self.y + 0.5))
+
+    def update(self):
+        x1, y1 = self.trajectory[self.current_point_index]
+        next_x, next_y = self.trajectory[self.next_point_index]
+        distance = math.sqrt((next_x - x1) ** 2 + (next_y - y1) ** 2)
+        speed_x = speed_y = 0
+        if distance:
+            speed_x = self.speed * (next_x - x1) / distance
+            speed_y = self.speed * (next_y - y1) / distance
+        self.x += speed_x
+        self.y += speed_y
+        self.rect = (math.floor(self.x + 0.5), math.floor(self.y + 0.5))
+        if (speed_x > 0 and self.x >= next_x) or (speed_x < 0 and self.x <= next_x):
+            self.x = next_x
+        if (speed_y > 0 and self.y >= next_y) or (speed_y < 0 and self.y <= next_y):
+            self.y = next_y
+        if self.x == next_x and self.y == next_y:
+            self.current_point_index = self.next_point_index
+            self.next_point_index = (self.next_point_index + 1) % len(self.trajectory)
+
+
+def test_swarm_matches_scalar_monsters():
+    rng = random.Random(0)
+    trajectories = []
+    for _ in range(40):
+        points = [[rng.randrange(0, 600), rng.randrange(0, 600)] for _ in range(rng.randrange(1, 6))]
+        if len(points) > 2:
+            # Повтор точки - отрезок нулевой длины
+            points.insert(1, list(points[0]))
+        trajectories.append(points)
+    swarm = engine.MonsterSwarm(trajectories)
+    monsters = [ScalarMonster(path) for path in trajectories]
+    for _ in range(3000):
+        swarm.update()
+        for monster in monsters:
+            monster.update()
+        assert swarm.rects.tolist() == [list(monster.rect) for monster in monsters]
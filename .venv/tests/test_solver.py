@@ -0,0 +1,101 @@
+import copy
+import random
+from collections import deque
+
+import engine
+import solver
+
+# Копия data/level.txt
+BUNDLED_LEVEL = ['[[#####[#####',
+                 '[[#...###...#',
+                 '[[#...#O#...#',
+                 '#####D#.#d#####',
+                 '#.K.k.........#',
+                 '#...#.W.S.#...#',
+                 '#####..P..#####',
+                 '#...#....M#...#',
+                 '#..*..........#',
+                 '######.#.######',
+                 '[[[[#..#..#',
+                 '[[[[#..#..#',
+                 '[[[[#..#..#',
+                 '[[[[#######']
+
+
+def brute_force(rows):
+    # Поиск в ширину по одиночным ходам на самом движке: длина кратчайшего решения или None
+    start = engine.GameState(rows, {})
+    queue = deque([(start, 0)])
+    seen = set()
+    while queue:
+        state, moves = queue.popleft()
+        for dx, dy in engine.DIRECTIONS.values():
+            following = copy.copy(state)
+            following.grid = engine.LevelGrid(state.grid.width, state.grid.height, state.grid.tiles)
+            following.inventory = list(state.inventory)
+            following.move(dx, dy)
+            if following.level_complete:
+                return moves + 1
+            key = (following.player, bytes(following.grid.tiles), tuple(sorted(following.inventory)))
+            if following.game_over or key in seen:
+                continue
+            seen.add(key)
+            queue.append((following, moves + 1))
+    return None
+
+
+def random_level(seed, size=7):
+    rng = random.Random(seed)
+    rows = [['#'] * size for _ in range(size)]
+    free = [(x, y) for y in range(1, size - 1) for x in range(1, size - 1)]
+    rng.shuffle(free)
+    for x, y in free:
+        rows[y][x] = '#' if rng.random() < 0.2 else '.'
+    tiles = 'PO' + 'S' * rng.randrange(3) + 'W' * rng.randrange(3) + rng.choice(['', 'KD', 'kD']) + \
+        '*' * rng.randrange(1, 3)
+    for code, (x, y) in zip(tiles, free):
+        rows[y][x] = code
+    return [''.join(row) for row in rows]
+
+
+def test_solver_matches_brute_force():
+    for seed in range(40):
+        rows = random_level(seed)
+        solution = solver.solve(rows)
+        expected = brute_force(rows)
+        assert solution.solvable == (expected is not None), rows
+        if expected is not None:
+            assert solution.moves == expected, rows
+            assert solver.verify(engine.compile_level(rows), solution.path)
+
+
+def test_bundled_level():
+    level = engine.compile_level(BUNDLED_LEVEL)
+    solution = solver.solve(level)
+    assert solution.solvable
+    assert solution.moves == 16
+    assert solver.verify(level, solution.path)
+    assert solution.within_time
+
+
+def test_water_without_sand_is_unsolvable():
+    solution = solver.solve(['#######',
+                             '#P.W*O#',
+                             '#######'])
+    assert solution.solvable is False
+
+
+def test_state_limit_reports_unknown():
+    rows = random_level(3, size=12)
+    solution = solver.solve(rows, max_states=1)
+    assert solution.solvable is None
+    assert solution.path is None
+
+
+def test_pruned_sand_search_stays_within_the_limit():
+    for seed in range(20):
+        rows = random_level(seed)
+        solution = solver.solve(rows, max_states=500, prune_sand=True)
+        assert solution.states <= 500
+        if solution.solvable:
+            assert solver.verify(engine.compile_level(rows), solution.path)